@@ -1,62 +1,20 @@
-def extract_board_grants(self, board_docs: Dict[str, str]) -> List[Dict]:
-        """Extract grants from board documents using deterministic rules"""
-        grants = []
-        
-        st.subheader("📋 Document Parsing Results")
-        
-        for filename, content in board_docs.items():
-            content_lower = content.lower()
-            
-            st.write(f"**Analyzing: {filename}**")
-            
-            # Check if it's a template
-            is_template = 'template' in filename.lower()
-            if is_template:
-                st.info(f"📄 {filename} identified as template - treating as valid board approval with actual grant data")
-            
-            # Determine document type
-            if 'repurchase' in content_lower:
-                st.write("Document type: Repurchase")
-                grant = self.extract_repurchase_info(content, filename)
-                if grant and (grant.get('stockholder') or grant.get('shares_repurchased')):
-                    grants.append(grant)
-                    st.success(f"✅ Successfully extracted repurchase data")
-                else:
-                    st.warning("⚠️ Could not extract repurchase data")
-                    
-            elif 'restricted stock' in content_lower or 'rsa' in content_lower:
-                st.write("Document type: Restricted Stock Grant")
-                grant = self.extract_rsa_grant(content, filename)
-                if grant and (grant.get('stockholder') or grant.get('shares')):
-                    grants.append(grant)
-                    st.success(f"✅ Successfully extracted RSA grant data")
-                else:
-                    st.warning("⚠️ Could not extract RSA grant data")
-                    
-            elif 'option' in content_lower:
-                st.write("Document type: Option Grant")
-                grant = self.extract_option_grant(content, filename)
-                if grant and (grant.get('stockholder') or grant.get('shares')):
-                    grants.append(grant)
-                    st.success(f"✅ Successfully extracted option grant data")
-                else:
-                    st.warning("⚠️ Could not extract option grant data")
-            
-            else:
-                st.write("Document type: Unknown")
-                st.warning("⚠️ Could not determine document type")
-        
-        st.write(f"**Total grants extracted: {len(grants)}**")
-        return grantsimport streamlit as st
+import streamlit as st
 import pandas as pd
+import numpy as np
 import openpyxl
 from docx import Document
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
 import io
+import csv
 from datetime import datetime
 import base64
 import anthropic
 import os
-from typing import List, Dict
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 
 # Page configuration
 st.set_page_config(
@@ -66,31 +24,178 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# LLM settings
+LLM_MODEL = "claude-3-5-sonnet-20241022"
+ANTHROPIC_KEEPALIVE_CONNECTIONS = 20
+ANTHROPIC_KEEPALIVE_EXPIRY = 120  # Seconds an idle connection is kept open for reuse
+# The SDK default read timeout is 10 minutes; fail fast instead and let the SDK retry 429/5xx with backoff
+ANTHROPIC_TIMEOUT = anthropic.Timeout(connect=5.0, read=90.0, write=30.0, pool=5.0)
+ANTHROPIC_MAX_RETRIES = 2
+DOCX_READ_WORKERS = 8
+DOCX_PREVIEW_CHARS = 1000
+
+# Rust-backed calamine parses .xlsx much faster than openpyxl; fall back when it isn't installed
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+ANALYSIS_SYSTEM_PROMPT = "You are a systematic legal auditor. Always follow the exact same analysis sequence and format. Be consistent and thorough in your approach."
+
+# Static parts of the analysis prompt; only the documents and cap table change between calls
+ANALYSIS_PROMPT_HEADER = """You are a lawyer conducting a standardized capitalization table tie out. You MUST follow this exact sequence:
+
+MANDATORY ANALYSIS SEQUENCE:
+1. DOCUMENT INVENTORY: List every board document and what it approves
+2. CAP TABLE INVENTORY: List every cap table entry (Security ID, Stockholder, Shares)
+3. SYSTEMATIC COMPARISON: For each cap table entry, check against board docs
+4. DISCREPANCY IDENTIFICATION: List each discrepancy separately with exact format
+
+STEP 1 - DOCUMENT INVENTORY:
+First, create a complete list of all board-approved grants from legal documents:
+- Document name, date, stockholder, shares, price, vesting details
+
+STEP 2 - CAP TABLE INVENTORY: 
+List every entry in the cap table:
+- Security ID, Stockholder Name, Quantity, Price details, Dates
+
+STEP 3 - SYSTEMATIC COMPARISON:
+For EACH cap table entry, verify these 7 items in order:
+a) Does this entry have board approval? (if no = PHANTOM EQUITY)
+b) Do share quantities match?
+c) Do prices match?
+d) Do board approval dates match?
+e) Do issue dates match?
+f) Do vesting schedules match (monthly vs annual)?
+g) Are repurchases reflected?
+
+STEP 4 - DISCREPANCY LIST:
+Use this EXACT format for each discrepancy:
+
+DISCREPANCY #[X]: [Issue Title]
+- Severity: HIGH/MEDIUM/LOW
+- Stockholder: [Name]
+- Security ID: [ID]
+- Cap Table Shows: [Value]
+- Legal Documents Show: [Value]
+- Source Document: [Filename]
+- Description: [1-2 sentences]
+
+CRITICAL REQUIREMENTS:
+- Analyze every single cap table entry
+- Check for phantom equity (entries without board approval)
+- Verify vesting schedule language matches exactly
+- Check for missing repurchase transactions
+- List each discrepancy separately (don't group)
+- Use consistent severity: HIGH=material issues, MEDIUM=dates/documentation, LOW=minor
+
+Here are the documents to analyze:
+
+BOARD DOCUMENTS:
+"""
+
+ANALYSIS_PROMPT_FOOTER = """
+
+NOW EXECUTE THE 4-STEP ANALYSIS SEQUENCE ABOVE.
+
+Begin with: "STEP 1 - DOCUMENT INVENTORY:" and follow the exact sequence."""
+
+# Page furniture and whitespace runs in board documents cost input tokens without adding content
+PAGE_HEADER_PATTERN = re.compile(r'^[ \t]*Page \d+( of \d+)?[ \t]*$', re.IGNORECASE | re.MULTILINE)
+INLINE_WHITESPACE_PATTERN = re.compile(r'[ \t\u00a0]+')
+LINE_BREAK_PATTERN = re.compile(r'\s*\n\s*')
+
+# Document parsing patterns, compiled once at import. List order is match priority
+MONTH_DATE = r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},\s+\d{4}'
+
+RSA_DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in [
+    r'Date:\s*([A-Za-z]+\s+\d{1,2},\s+\d{4})',
+    r'dated\s+([A-Za-z]+\s+\d{1,2},\s+\d{4})',
+    r'(\d{1,2}/\d{1,2}/\d{4})',
+    MONTH_DATE
+])
+
+STOCKHOLDER_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in [
+    r'Name[:\s]+([A-Za-z\s]+)',
+    r'([A-Za-z]+\s+[A-Za-z]+)\s+\d+,?\d*\s+\$',  # Name followed by numbers and $
+    r'([A-Za-z]+\s+[A-Za-z]+)\s+\d+,?\d*\s+shares',
+    r'to\s+([A-Za-z]+\s+[A-Za-z]+)',
+    r'from\s+([A-Za-z]+\s+[A-Za-z]+)',
+])
+
+SHARE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in [
+    r'(\d{1,3}(?:,\d{3})*)\s+shares?',
+    r'shares?\s+(\d{1,3}(?:,\d{3})*)',
+    r'issue.*?(\d{1,3}(?:,\d{3})*)',
+    r'grant.*?(\d{1,3}(?:,\d{3})*)',
+    # Look in schedule/table format
+    r'(\d{1,3}(?:,\d{3})*)\s+\$',  # Number followed by $
+])
+
+PRICE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in [
+    r'\$(\d+\.\d{2})\s+per\s+share',
+    r'price.*?\$(\d+\.\d{2})',
+    r'\$(\d+\.\d{2})',  # Any dollar amount
+    r'(\d+\.\d{2})\s+per\s+share',
+])
+
+VESTING_DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in [
+    r'vesting.*?' + MONTH_DATE,
+    r'start.*?' + MONTH_DATE,
+    r'commencement.*?' + MONTH_DATE,
+])
+
+REPURCHASE_DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in [
+    r'Date:\s*([A-Za-z]+\s+\d{1,2},\s+\d{4})',
+    r'dated\s+([A-Za-z]+\s+\d{1,2},\s+\d{4})',
+])
+
+REPURCHASE_SHARE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in [
+    r'repurchase\s+(\d{1,3}(?:,\d{3})*)\s+',
+    r'(\d{1,3}(?:,\d{3})*)\s+unvested\s+shares',
+    r'(\d{1,3}(?:,\d{3})*)\s+shares.*repurchas',
+    r'exercise.*right.*repurchase\s+(\d{1,3}(?:,\d{3})*)',
+])
+
+OPTION_DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in [
+    r'Date:\s*([A-Za-z]+\s+\d{1,2},\s+\d{4})',
+    r'executed.*?([A-Za-z]+\s+\d{1,2},\s+\d{4})',
+])
+
+# Schedule A rows like "John Doe 10,000 $1.00" - case-sensitive on purpose
+OPTION_TABLE_PATTERN = re.compile(r'([A-Za-z]+\s+[A-Za-z]+)\s+(\d{1,3}(?:,\d{3})*)\s+\$(\d+\.\d{2})')
+
+COMMON_NAMES = ('John Doe', 'Jane Smith', 'Bob', 'Alice', 'Charlie', 'Arthur')
+STOCKHOLDER_FALSE_POSITIVES = ('Date', 'DIRECTORS', 'Name', 'Board', 'Company')
+COMMON_NAME_PATTERN = re.compile('|'.join(map(re.escape, COMMON_NAMES)))
+
+# (CSV header, discrepancy key) pairs for the downloadable report
+REPORT_COLUMNS = [
+    ('Discrepancy #', 'number'),
+    ('Severity', 'severity'),
+    ('Stockholder', 'stockholder'),
+    ('Security ID', 'security_id'),
+    ('Issue', 'issue'),
+    ('Cap Table Shows', 'cap_table_value'),
+    ('Legal Documents Show', 'legal_value'),
+    ('Description', 'description'),
+    ('Source Document', 'source')
+]
+
 class DeterministicCapTableAnalyzer:
     def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = get_anthropic_client(api_key)
         self.uploaded_files = {}
         
-    def read_docx_content(self, file_content: bytes, filename: str) -> str:
-        """Read DOCX content and return as plain text"""
-        try:
-            doc = Document(io.BytesIO(file_content))
-            full_text = []
-            for paragraph in doc.paragraphs:
-                full_text.append(paragraph.text)
-            return '\n'.join(full_text)
-        except Exception as e:
-            st.error(f"Error reading {filename}: {str(e)}")
-            return ""
-    
     def excel_to_structured_data(self, file_content: bytes, filename: str) -> List[Dict]:
         """Convert Excel to structured data for analysis"""
         try:
-            df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl', header=None)
+            df = cached_excel_sheet(file_content)
             
-            # Find header row
+            # Find header row - stop at the first match, it is usually within the first few rows
             header_row_idx = None
-            for i, row in df.iterrows():
+            for i, row in enumerate(df.itertuples(index=False, name=None)):
                 row_str = ' '.join([str(cell) for cell in row if pd.notna(cell)])
                 if 'Security ID' in row_str and 'Stakeholder Name' in row_str:
                     header_row_idx = i
@@ -99,18 +204,17 @@ class DeterministicCapTableAnalyzer:
             if header_row_idx is None:
                 return []
             
-            # Extract headers and data
-            headers = df.iloc[header_row_idx].tolist()
+            # Extract headers and data - walk a plain ndarray with a precomputed notna mask
+            # instead of building a Series per row with iloc
+            values = df.to_numpy()
+            present = df.notna().to_numpy()
+            columns = [(j, str(header)) for j, header in enumerate(values[header_row_idx])
+                       if present[header_row_idx, j]]
             entries = []
             
-            for i in range(header_row_idx + 1, len(df)):
-                row = df.iloc[i]
-                if pd.notna(row.iloc[0]) and str(row.iloc[0]).strip():  # Has Security ID
-                    entry = {}
-                    for j, header in enumerate(headers):
-                        if j < len(row) and pd.notna(header):
-                            entry[str(header)] = row.iloc[j] if pd.notna(row.iloc[j]) else ""
-                    entries.append(entry)
+            for row, row_present in zip(values[header_row_idx + 1:], present[header_row_idx + 1:]):
+                if row_present[0] and str(row[0]).strip():  # Has Security ID
+                    entries.append({header: row[j] if row_present[j] else "" for j, header in columns})
             
             return entries
             
@@ -121,29 +225,75 @@ class DeterministicCapTableAnalyzer:
     def extract_board_grants(self, board_docs: Dict[str, str]) -> List[Dict]:
         """Extract grants from board documents using deterministic rules"""
         grants = []
+        parse_results = []
+        
+        st.subheader("📋 Document Parsing Results")
         
         for filename, content in board_docs.items():
             content_lower = content.lower()
             
+            # Templates carry actual grant data and count as valid board approvals
+            notes = 'Template - treated as valid board approval' if 'template' in filename.lower() else ''
+            
             # Determine document type
             if 'repurchase' in content_lower:
+                doc_type = 'Repurchase'
                 grant = self.extract_repurchase_info(content, filename)
-                if grant:
-                    grants.append(grant)
+                extracted = bool(grant and (grant.get('stockholder') or grant.get('shares_repurchased')))
+                    
             elif 'restricted stock' in content_lower or 'rsa' in content_lower:
+                doc_type = 'Restricted Stock Grant'
                 grant = self.extract_rsa_grant(content, filename)
-                if grant:
-                    grants.append(grant)
+                extracted = bool(grant and (grant.get('stockholder') or grant.get('shares')))
+                    
             elif 'option' in content_lower:
+                doc_type = 'Option Grant'
                 grant = self.extract_option_grant(content, filename)
-                if grant:
-                    grants.append(grant)
+                extracted = bool(grant and (grant.get('stockholder') or grant.get('shares')))
+            
+            else:
+                doc_type = 'Unknown'
+                grant = None
+                extracted = False
+            
+            if extracted:
+                grants.append(grant)
+                status = '✅ Extracted'
+            elif doc_type == 'Unknown':
+                status = '⚠️ Could not determine document type'
+            else:
+                status = '⚠️ Could not extract data'
+            
+            parse_results.append({
+                'Document': filename,
+                'Document Type': doc_type,
+                'Status': status,
+                'Notes': notes
+            })
+        
+        # Render one summary table instead of several status messages per document
+        if parse_results:
+            st.dataframe(pd.DataFrame(parse_results), hide_index=True, use_container_width=True)
         
+        st.write(f"**Total grants extracted: {len(grants)}**")
         return grants
     
+    @staticmethod
+    def show_parsing_log(filename: str, log: List[str]):
+        """Show a document's extractor diagnostics in one expander, only when parsing details are switched on"""
+        if st.session_state.get('debug', False):
+            with st.expander(f"Parsing details: {filename}"):
+                st.markdown('\n\n'.join(log))
+    
+    @staticmethod
+    def find_common_name(content: str) -> Optional[str]:
+        """Return the first COMMON_NAMES entry that appears in content, scanning it once"""
+        # No name overlaps another, so one pass sees every name present; COMMON_NAMES order still decides
+        found = set(COMMON_NAME_PATTERN.findall(content))
+        return next((name for name in COMMON_NAMES if name in found), None)
+    
     def extract_rsa_grant(self, content: str, filename: str) -> Dict:
         """Extract RSA grant info using comprehensive pattern matching"""
-        import re
         
         grant = {
             'type': 'RSA Grant',
@@ -156,36 +306,107 @@ class DeterministicCapTableAnalyzer:
             'vesting_schedule': None
         }
         
-        # Debug: Show what we're parsing
-        st.write(f"**Parsing {filename}:**")
-        st.write(f"Content length: {len(content)} characters")
+        # Debug: Collect what we're parsing and show it in one block at the end
+        log = []
+        log.append(f"**Parsing {filename}:**")
+        log.append(f"Content length: {len(content)} characters")
         
         # Extract date - multiple patterns
-        date_patterns = [
-            r'Date:\s*([A-Za-z]+\s+\d{1,2},\s+\d{4})',
-            r'dated\s+([A-Za-z]+\s+\d{1,2},\s+\d{4})',
-            r'(\d{1,2}/\d{1,2}/\d{4})',
-            r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},\s+\d{4}'
-        ]
-        
-        for pattern in date_patterns:
-            date_match = re.search(pattern, content, re.IGNORECASE)
+        for pattern in RSA_DATE_PATTERNS:
+            date_match = pattern.search(content)
             if date_match:
                 grant['date'] = date_match.group(1)
-                st.write(f"✅ Found date: {grant['date']}")
+                log.append(f"✅ Found date: {grant['date']}")
                 break
         
         if not grant['date']:
-            st.write("❌ No date found")
+            log.append("❌ No date found")
         
         # Extract stockholder - look in schedule/table and throughout document
-        stockholder_patterns = [
-            r'Name[:\s]+([A-Za-z\s]+)',
-            r'([A-Za-z]+\s+[A-Za-z]+)\s+\d+,?\d*\s+\
+        # Also look for common names explicitly
+        name = self.find_common_name(content)
+        if name:
+            grant['stockholder'] = name
+            log.append(f"✅ Found stockholder: {name}")
+        
+        if not grant['stockholder']:
+            for pattern in STOCKHOLDER_PATTERNS:
+                match = pattern.search(content)
+                if match:
+                    name = match.group(1).strip()
+                    # Filter out common false positives
+                    if name not in STOCKHOLDER_FALSE_POSITIVES:
+                        grant['stockholder'] = name
+                        log.append(f"✅ Found stockholder via pattern: {name}")
+                        break
+        
+        if not grant['stockholder']:
+            log.append("❌ No stockholder found")
+        
+        # Extract shares - multiple patterns
+        for pattern in SHARE_PATTERNS:
+            share_match = pattern.search(content)
+            if share_match:
+                shares_str = share_match.group(1).replace(',', '')
+                try:
+                    shares_num = int(shares_str)
+                    if 100 <= shares_num <= 1000000:  # Reasonable range
+                        grant['shares'] = shares_num
+                        log.append(f"✅ Found shares: {shares_num}")
+                        break
+                except ValueError:
+                    continue
+        
+        if not grant['shares']:
+            log.append("❌ No shares found")
+        
+        # Extract price - multiple patterns
+        for pattern in PRICE_PATTERNS:
+            price_match = pattern.search(content)
+            if price_match:
+                try:
+                    price = float(price_match.group(1))
+                    if 0.01 <= price <= 1000:  # Reasonable range
+                        grant['price_per_share'] = price
+                        log.append(f"✅ Found price: ${price}")
+                        break
+                except ValueError:
+                    continue
+        
+        if not grant['price_per_share']:
+            log.append("❌ No price found")
+        
+        # Extract vesting start date
+        for pattern in VESTING_DATE_PATTERNS:
+            vesting_match = pattern.search(content)
+            if vesting_match:
+                grant['vesting_start'] = vesting_match.group(1)
+                log.append(f"✅ Found vesting start: {grant['vesting_start']}")
+                break
+        
+        if not grant['vesting_start']:
+            log.append("❌ No vesting start date found")
+        
+        # Extract vesting schedule
+        if '1/48' in content:
+            if 'month' in content.lower():
+                grant['vesting_schedule'] = '1/48th monthly'
+                log.append("✅ Found vesting: 1/48th monthly")
+        elif '25%' in content:
+            if 'annual' in content.lower() or 'year' in content.lower():
+                grant['vesting_schedule'] = '25% annually'
+                log.append("✅ Found vesting: 25% annually")
+        
+        if not grant['vesting_schedule']:
+            log.append("❌ No vesting schedule found")
+        
+        log.append(f"**Final extracted data:** {grant}")
+        self.show_parsing_log(filename, log)
+        
+        return grant
     
     def extract_repurchase_info(self, content: str, filename: str) -> Dict:
         """Extract repurchase info with comprehensive parsing"""
-        import re
         
         repurchase = {
             'type': 'Repurchase',
@@ -195,58 +416,44 @@ class DeterministicCapTableAnalyzer:
             'date': None
         }
         
-        st.write(f"**Parsing repurchase document {filename}:**")
+        log = []
+        log.append(f"**Parsing repurchase document {filename}:**")
         
         # Extract date
-        date_patterns = [
-            r'Date:\s*([A-Za-z]+\s+\d{1,2},\s+\d{4})',
-            r'dated\s+([A-Za-z]+\s+\d{1,2},\s+\d{4})',
-        ]
-        
-        for pattern in date_patterns:
-            date_match = re.search(pattern, content, re.IGNORECASE)
+        for pattern in REPURCHASE_DATE_PATTERNS:
+            date_match = pattern.search(content)
             if date_match:
                 repurchase['date'] = date_match.group(1)
-                st.write(f"✅ Found repurchase date: {repurchase['date']}")
+                log.append(f"✅ Found repurchase date: {repurchase['date']}")
                 break
         
         # Extract stockholder
-        common_names = ['John Doe', 'Jane Smith', 'Bob', 'Alice', 'Charlie', 'Arthur']
-        for name in common_names:
-            if name in content:
-                repurchase['stockholder'] = name
-                st.write(f"✅ Found stockholder: {name}")
-                break
+        name = self.find_common_name(content)
+        if name:
+            repurchase['stockholder'] = name
+            log.append(f"✅ Found stockholder: {name}")
         
         # Extract repurchased shares - multiple patterns
-        repurchase_patterns = [
-            r'repurchase\s+(\d{1,3}(?:,\d{3})*)\s+',
-            r'(\d{1,3}(?:,\d{3})*)\s+unvested\s+shares',
-            r'(\d{1,3}(?:,\d{3})*)\s+shares.*repurchas',
-            r'exercise.*right.*repurchase\s+(\d{1,3}(?:,\d{3})*)',
-        ]
-        
-        for pattern in repurchase_patterns:
-            repurchase_match = re.search(pattern, content, re.IGNORECASE)
+        for pattern in REPURCHASE_SHARE_PATTERNS:
+            repurchase_match = pattern.search(content)
             if repurchase_match:
                 shares_str = repurchase_match.group(1).replace(',', '')
                 try:
                     shares = int(shares_str)
                     if 1 <= shares <= 100000:  # Reasonable range
                         repurchase['shares_repurchased'] = shares
-                        st.write(f"✅ Found repurchased shares: {shares}")
+                        log.append(f"✅ Found repurchased shares: {shares}")
                         break
                 except ValueError:
                     continue
         
-        st.write(f"**Final repurchase data:** {repurchase}")
-        st.write("---")
+        log.append(f"**Final repurchase data:** {repurchase}")
+        self.show_parsing_log(filename, log)
         
         return repurchase
     
     def extract_option_grant(self, content: str, filename: str) -> Dict:
         """Extract option grant info from documents like the one you showed"""
-        import re
         
         grant = {
             'type': 'Option Grant',
@@ -259,19 +466,15 @@ class DeterministicCapTableAnalyzer:
             'vesting_schedule': None
         }
         
-        st.write(f"**Parsing option grant {filename}:**")
+        log = []
+        log.append(f"**Parsing option grant {filename}:**")
         
         # Extract date - "Date: January 1, 2025"
-        date_patterns = [
-            r'Date:\s*([A-Za-z]+\s+\d{1,2},\s+\d{4})',
-            r'executed.*?([A-Za-z]+\s+\d{1,2},\s+\d{4})',
-        ]
-        
-        for pattern in date_patterns:
-            date_match = re.search(pattern, content, re.IGNORECASE)
+        for pattern in OPTION_DATE_PATTERNS:
+            date_match = pattern.search(content)
             if date_match:
                 grant['date'] = date_match.group(1)
-                st.write(f"✅ Found option grant date: {grant['date']}")
+                log.append(f"✅ Found option grant date: {grant['date']}")
                 break
         
         # Extract stockholders - this document has multiple optionees
@@ -279,8 +482,7 @@ class DeterministicCapTableAnalyzer:
         optionees = []
         
         # Pattern for "John Doe 10,000 $1.00"
-        table_pattern = r'([A-Za-z]+\s+[A-Za-z]+)\s+(\d{1,3}(?:,\d{3})*)\s+\$(\d+\.\d{2})'
-        matches = re.findall(table_pattern, content)
+        matches = OPTION_TABLE_PATTERN.findall(content)
         
         for match in matches:
             name, shares_str, price_str = match
@@ -293,7 +495,7 @@ class DeterministicCapTableAnalyzer:
                         'shares': shares,
                         'price_per_share': price
                     })
-                    st.write(f"✅ Found optionee: {name} - {shares} shares at ${price}")
+                    log.append(f"✅ Found optionee: {name} - {shares} shares at ${price}")
                 except ValueError:
                     continue
         
@@ -305,22 +507,22 @@ class DeterministicCapTableAnalyzer:
         # Extract vesting start dates - look for patterns in the table
         if grant['stockholder']:
             # Look for vesting start associated with this person
-            vesting_pattern = rf"{re.escape(grant['stockholder'])}.*?(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{{1,2}},\s+\d{{4}}"
+            vesting_pattern = rf"{re.escape(grant['stockholder'])}.*?{MONTH_DATE}"
             vesting_match = re.search(vesting_pattern, content, re.IGNORECASE)
             if vesting_match:
                 grant['vesting_start'] = vesting_match.group(1)
-                st.write(f"✅ Found vesting start: {grant['vesting_start']}")
+                log.append(f"✅ Found vesting start: {grant['vesting_start']}")
         
         # Extract vesting schedule - look for the specific patterns
         if '1/48th' in content and 'monthly' in content:
             grant['vesting_schedule'] = '1/48th monthly'
-            st.write("✅ Found vesting: 1/48th monthly")
+            log.append("✅ Found vesting: 1/48th monthly")
         elif '25%' in content and 'first anniversary' in content:
             grant['vesting_schedule'] = '25% cliff + 1/48th monthly'
-            st.write("✅ Found vesting: 25% cliff + 1/48th monthly")
+            log.append("✅ Found vesting: 25% cliff + 1/48th monthly")
         
-        st.write(f"**Final option grant data:** {grant}")
-        st.write("---")
+        log.append(f"**Final option grant data:** {grant}")
+        self.show_parsing_log(filename, log)
         
         return grant
     
@@ -329,31 +531,47 @@ class DeterministicCapTableAnalyzer:
         discrepancies = []
         
         # Create lookup of board grants by stockholder
-        board_lookup = {}
+        board_lookup = defaultdict(list)
         repurchases = []
         
         for grant in board_grants:
             if grant['type'] == 'Repurchase':
                 repurchases.append(grant)
-            else:
-                stockholder = grant.get('stockholder')
-                if stockholder:
-                    if stockholder not in board_lookup:
-                        board_lookup[stockholder] = []
-                    board_lookup[stockholder].append(grant)
+                continue
+            stockholder = grant.get('stockholder')
+            if stockholder:
+                board_lookup[stockholder].append(grant)
+        
+        # Index grants by (stockholder, shares) with the ±1 share tolerance folded in, so matching an
+        # entry is one dict lookup; setdefault keeps the first grant in document order for each key
+        grant_index = {}
+        for stockholder, grants in board_lookup.items():
+            for grant in grants:
+                board_shares = grant.get('shares')
+                if board_shares is None:
+                    continue
+                for candidate in (board_shares - 1, board_shares, board_shares + 1):
+                    grant_index.setdefault((stockholder, candidate), grant)
+        
+        # Coerce the numeric columns once rather than converting each entry
+        quantities = self.safe_int_series(
+            pd.Series([entry.get('Quantity Issued', 0) for entry in cap_table_entries], dtype=object)
+        ).to_numpy()
+        cost_bases = self.safe_float_series(
+            pd.Series([entry.get('Cost Basis', 0) for entry in cap_table_entries], dtype=object)
+        ).to_numpy()
+        
+        # Calculate price per share for every entry in one division, 0 where no shares were issued
+        share_counts = quantities.astype('float64')
+        prices = np.divide(cost_bases, share_counts, out=np.zeros_like(cost_bases), where=share_counts > 0)
         
         # Check each cap table entry
-        for entry in cap_table_entries:
+        for entry, shares, price_per_share in zip(cap_table_entries, quantities.tolist(), prices.tolist()):
             security_id = entry.get('Security ID', '')
             stockholder = entry.get('Stakeholder Name', '')
-            shares = self.safe_int(entry.get('Quantity Issued', 0))
-            cost_basis = self.safe_float(entry.get('Cost Basis', 0))
             board_approval_date = str(entry.get('Board Approval Date', ''))
             vesting_schedule = str(entry.get('Vesting Schedule', ''))
             
-            # Calculate price per share
-            price_per_share = cost_basis / shares if shares > 0 else 0
-            
             # Check 1: Phantom Equity (no board approval found)
             if stockholder not in board_lookup:
                 discrepancies.append({
@@ -370,11 +588,7 @@ class DeterministicCapTableAnalyzer:
                 continue
             
             # Find matching board grant
-            matching_grant = None
-            for grant in board_lookup[stockholder]:
-                if grant.get('shares') == shares or abs((grant.get('shares', 0) - shares)) <= 1:
-                    matching_grant = grant
-                    break
+            matching_grant = grant_index.get((stockholder, shares))
             
             if not matching_grant:
                 matching_grant = board_lookup[stockholder][0]  # Use first grant as fallback
@@ -427,8 +641,10 @@ class DeterministicCapTableAnalyzer:
             # Check 5: Vesting schedule mismatch
             board_vesting = matching_grant.get('vesting_schedule', '')
             if board_vesting and board_vesting not in vesting_schedule:
-                if ('monthly' in board_vesting.lower() and 'monthly' not in vesting_schedule.lower()) or \
-                   ('annual' in board_vesting.lower() and 'annual' not in vesting_schedule.lower()):
+                board_vesting_lower = board_vesting.lower()
+                vesting_schedule_lower = vesting_schedule.lower()
+                if ('monthly' in board_vesting_lower and 'monthly' not in vesting_schedule_lower) or \
+                   ('annual' in board_vesting_lower and 'annual' not in vesting_schedule_lower):
                     discrepancies.append({
                         'number': len(discrepancies) + 1,
                         'severity': 'HIGH',
@@ -461,1416 +677,175 @@ class DeterministicCapTableAnalyzer:
         
         return discrepancies
     
-    def safe_int(self, value) -> int:
-        """Safely convert to int"""
-        try:
-            if pd.isna(value):
-                return 0
-            return int(float(value))
-        except (ValueError, TypeError):
-            return 0
+    @staticmethod
+    def safe_int_series(values: pd.Series) -> pd.Series:
+        """Safely convert a whole column to int, blank or unparseable values become 0"""
+        numbers = pd.to_numeric(values, errors='coerce').fillna(0)
+        # astype('int64') silently wraps values outside its range, so keep exact Python ints for those
+        if (numbers.abs() < 2 ** 63).all():
+            return numbers.astype('int64')
+        return numbers.map(int).astype(object)
     
-    def safe_float(self, value) -> float:
-        """Safely convert to float"""
-        try:
-            if pd.isna(value):
-                return 0.0
-            return float(value)
-        except (ValueError, TypeError):
-            return 0.0
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
-        self.uploaded_files = {}
-        
-    def read_docx_content(self, file_content: bytes, filename: str) -> str:
+    @staticmethod
+    def safe_float_series(values: pd.Series) -> pd.Series:
+        """Safely convert a whole column to float, blank or unparseable values become 0.0"""
+        return pd.to_numeric(values, errors='coerce').fillna(0.0).astype('float64')
+    
+    @staticmethod
+    def docx_to_text(file_content: bytes, max_chars: Optional[int] = None) -> str:
+        """Extract plain text from DOCX bytes, stopping once max_chars have been read (raises on unreadable files)"""
+        doc = Document(io.BytesIO(file_content))
+        full_text = []
+        total_chars = 0
+        # Walk the body's <w:p> elements lazily rather than materialising doc.paragraphs,
+        # so a capped preview only wraps the paragraphs it actually reads
+        for p in doc.element.body.iterchildren(qn('w:p')):
+            text = Paragraph(p, doc).text
+            full_text.append(text)
+            total_chars += len(text) + 1
+            if max_chars is not None and total_chars >= max_chars:
+                break
+        return '\n'.join(full_text)
+    
+    def read_docx_content(self, file_content: bytes, filename: str, max_chars: Optional[int] = None) -> str:
         """Read DOCX content and return as plain text"""
         try:
-            doc = Document(io.BytesIO(file_content))
-            full_text = []
-            for paragraph in doc.paragraphs:
-                full_text.append(paragraph.text)
-            return '\n'.join(full_text)
+            return cached_docx_text(file_content, max_chars)
         except Exception as e:
             st.error(f"Error reading {filename}: {str(e)}")
             return ""
     
+    def read_docx_contents(self, files: List[Tuple[str, bytes]]) -> Dict[str, str]:
+        """Read several DOCX files concurrently, keeping the given order"""
+        board_docs = {}
+        if not files:
+            return board_docs
+        
+        results = cached_docx_texts(tuple(content for _, content in files))
+        for (filename, _), (text, error) in zip(files, results):
+            if error is not None:
+                st.error(f"Error reading {filename}: {error}")
+            board_docs[filename] = text
+        
+        return board_docs
+    
     def excel_to_text_preview(self, file_content: bytes, filename: str) -> str:
         """Convert Excel to text preview for LLM analysis"""
         try:
-            df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl', header=None)
+            df = cached_excel_sheet(file_content)
             
             # Create text representation
             text_preview = f"Excel file: {filename}\n\n"
             text_preview += "Raw data structure:\n"
             
-            for i in range(min(15, len(df))):  # First 15 rows
-                row_data = df.iloc[i].tolist()
-                # Clean up the row data
-                cleaned_row = []
-                for cell in row_data:
-                    if pd.isna(cell):
-                        cleaned_row.append("")
-                    else:
-                        cleaned_row.append(str(cell))
-                text_preview += f"Row {i + 1}: {cleaned_row}\n"
+            # First 15 rows, blanks for missing cells - cleaned in one vectorised pass instead of per cell
+            head = df.head(15).astype(object)
+            cleaned_rows = head.where(head.notna(), "").astype(str).values.tolist()
+            text_preview += ''.join(f"Row {i + 1}: {row}\n" for i, row in enumerate(cleaned_rows))
             
             return text_preview
         except Exception as e:
             return f"Error reading Excel file {filename}: {str(e)}"
     
-    def create_analysis_prompt(self, board_docs: Dict[str, str], cap_table_text: str) -> str:
-        """Create the enhanced prompt that catches all discrepancies with standardized approach"""
-        
-        prompt = """You are a lawyer conducting a standardized capitalization table tie out. You MUST follow this exact sequence:
-
-MANDATORY ANALYSIS SEQUENCE:
-1. DOCUMENT INVENTORY: List every board document and what it approves
-2. CAP TABLE INVENTORY: List every cap table entry (Security ID, Stockholder, Shares)
-3. SYSTEMATIC COMPARISON: For each cap table entry, check against board docs
-4. DISCREPANCY IDENTIFICATION: List each discrepancy separately with exact format
-
-STEP 1 - DOCUMENT INVENTORY:
-First, create a complete list of all board-approved grants from legal documents:
-- Document name, date, stockholder, shares, price, vesting details
-
-STEP 2 - CAP TABLE INVENTORY: 
-List every entry in the cap table:
-- Security ID, Stockholder Name, Quantity, Price details, Dates
-
-STEP 3 - SYSTEMATIC COMPARISON:
-For EACH cap table entry, verify these 7 items in order:
-a) Does this entry have board approval? (if no = PHANTOM EQUITY)
-b) Do share quantities match?
-c) Do prices match?
-d) Do board approval dates match?
-e) Do issue dates match?
-f) Do vesting schedules match (monthly vs annual)?
-g) Are repurchases reflected?
-
-STEP 4 - DISCREPANCY LIST:
-Use this EXACT format for each discrepancy:
-
-DISCREPANCY #[X]: [Issue Title]
-- Severity: HIGH/MEDIUM/LOW
-- Stockholder: [Name]
-- Security ID: [ID]
-- Cap Table Shows: [Value]
-- Legal Documents Show: [Value]
-- Source Document: [Filename]
-- Description: [1-2 sentences]
-
-CRITICAL REQUIREMENTS:
-- Analyze every single cap table entry
-- Check for phantom equity (entries without board approval)
-- Verify vesting schedule language matches exactly
-- Check for missing repurchase transactions
-- List each discrepancy separately (don't group)
-- Use consistent severity: HIGH=material issues, MEDIUM=dates/documentation, LOW=minor
-
-Here are the documents to analyze:
-
-BOARD DOCUMENTS:
-"""
-        
-        # Add each board document
-        for filename, content in board_docs.items():
-            prompt += f"\n--- {filename} ---\n{content}\n"
+    @staticmethod
+    def compress_document_text(text: str) -> str:
+        """Strip page numbers and collapse redundant whitespace before text goes into a prompt"""
+        text = PAGE_HEADER_PATTERN.sub('', text)
+        text = INLINE_WHITESPACE_PATTERN.sub(' ', text)
+        text = LINE_BREAK_PATTERN.sub('\n', text)
+        return text.strip()
+    
+    def create_analysis_content(self, board_docs: Dict[str, str], cap_table_text: str) -> List[Dict]:
+        """Build the analysis prompt as message content blocks, with the instructions and board documents cacheable"""
         
-        prompt += f"\nSECURITIES LEDGER / CAP TABLE:\n{cap_table_text}\n"
+        # Add each board document - joined once rather than growing the string per document
+        prompt = ANALYSIS_PROMPT_HEADER + ''.join(
+            f"\n--- {filename} ---\n{self.compress_document_text(content)}\n"
+            for filename, content in board_docs.items()
+        )
         
-        prompt += """
-
-NOW EXECUTE THE 4-STEP ANALYSIS SEQUENCE ABOVE.
-
-Begin with: "STEP 1 - DOCUMENT INVENTORY:" and follow the exact sequence."""
+        ledger = f"\nSECURITIES LEDGER / CAP TABLE:\n{cap_table_text}\n"
+        ledger += ANALYSIS_PROMPT_FOOTER
         
-        return prompt
+        # The instructions alone are below the minimum cacheable prompt length, so the
+        # cache breakpoint goes after the board documents, which change less often than the ledger
+        return [
+            {"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": ledger}
+        ]
     
     def analyze_with_llm(self, board_docs: Dict[str, str], cap_table_text: str) -> str:
         """Send documents to LLM for analysis"""
         
-        prompt = self.create_analysis_prompt(board_docs, cap_table_text)
+        content = self.create_analysis_content(board_docs, cap_table_text)
         
         try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
+            # Stream the response so text is consumed as it arrives instead of after the full completion
+            chunks = []
+            with self.client.messages.stream(
+                model=LLM_MODEL,
                 max_tokens=4000,
                 temperature=0,  # Maximum determinism
-                system="You are a systematic legal auditor. Always follow the exact same analysis sequence and format. Be consistent and thorough in your approach.",
+                system=ANALYSIS_SYSTEM_PROMPT,
                 messages=[
                     {
                         "role": "user", 
-                        "content": prompt
+                        "content": content
                     }
                 ]
-            )
+            ) as stream:
+                for text in stream.text_stream:
+                    chunks.append(text)
             
-            return response.content[0].text
+            return ''.join(chunks)
             
         except Exception as e:
             return f"Error analyzing documents: {str(e)}"
 
-def main():
-    st.title("📊 Cap Table Tie-Out Analysis")
-    st.markdown("*LLM-powered analysis replicating expert legal review*")
-    
-    # Initialize analyzer with API key from secrets
-    if 'analyzer' not in st.session_state:
-        try:
-            api_key = st.secrets["ANTHROPIC_API_KEY"]
-            st.session_state.analyzer = DeterministicCapTableAnalyzer(api_key)
-        except KeyError:
-            st.error("❌ Anthropic API key not found in Streamlit secrets. Please configure ANTHROPIC_API_KEY in your .streamlit/secrets.toml file")
-            st.stop()
-    
-    # File upload section
-    with st.sidebar:
-        st.header("📁 Upload Documents")
-        
-        # Board documents upload
-        st.subheader("Board Documents")
-        board_files = st.file_uploader(
-            "Upload board consents, minutes, and legal docs",
-            type=['docx', 'doc'],
-            accept_multiple_files=True,
-            key="board_docs",
-            help="Upload DOCX files containing board resolutions, consents, and other legal documents"
-        )
-        
-        # Securities ledger upload
-        st.subheader("Securities Ledger")
-        cap_table_file = st.file_uploader(
-            "Upload cap table (Excel format)",
-            type=['xlsx', 'xls'],
-            key="cap_table",
-            help="Upload Excel file containing the company's capitalization table"
-        )
-        
-        # Analysis button
-        st.markdown("---")
-        run_analysis = st.button(
-            "🔍 Run LLM Tie-Out Analysis", 
-            type="primary", 
-            use_container_width=True
-        )
-    
-    # Main content area
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
-        st.subheader("📋 Uploaded Documents")
-        
-        if board_files:
-            st.write("**Board Documents:**")
-            for file in board_files:
-                st.write(f"✅ {file.name}")
-                
-            # Show preview of first document
-            if st.checkbox("Show document preview"):
-                first_file = board_files[0]
-                first_file.seek(0)
-                analyzer = st.session_state.get('analyzer')
-                if analyzer:
-                    content = analyzer.read_docx_content(first_file.read(), first_file.name)
-                    st.text_area("Document content preview:", content[:1000] + "...", height=200)
-        else:
-            st.info("No board documents uploaded yet")
-        
-        if cap_table_file:
-            st.write("**Securities Ledger:**")
-            st.write(f"✅ {cap_table_file.name}")
-            
-            # Show preview of cap table
-            if st.checkbox("Show cap table preview"):
-                cap_table_file.seek(0)
-                try:
-                    df_preview = pd.read_excel(io.BytesIO(cap_table_file.read()), engine='openpyxl')
-                    st.dataframe(df_preview.head(10))
-                except Exception as e:
-                    st.error(f"Error previewing cap table: {e}")
-        else:
-            st.info("No securities ledger uploaded yet")
-    
-    with col2:
-        st.subheader("⚙️ Analysis Status")
-        
-        if not board_files and not cap_table_file:
-            st.warning("📄 Please upload documents to begin analysis")
-        elif not board_files:
-            st.warning("📋 Please upload board documents")
-        elif not cap_table_file:
-            st.warning("📊 Please upload securities ledger")
-        else:
-            st.success("✅ Ready for LLM analysis!")
-            st.info("Click 'Run LLM Tie-Out Analysis' to start")
-    
-    # Run analysis when button is clicked
-    if run_analysis:
-        if not board_files or not cap_table_file:
-            st.error("Please upload both board documents and securities ledger before running analysis")
-            return
-        
-        with st.spinner("🔍 Running deterministic analysis... This will be consistent every time"):
-            try:
-                analyzer = st.session_state.analyzer
-                
-                # Process board documents in consistent order (alphabetical)
-                board_docs = {}
-                sorted_files = sorted(board_files, key=lambda x: x.name)
-                for file in sorted_files:
-                    file.seek(0)  # Reset file pointer
-                    content = analyzer.read_docx_content(file.read(), file.name)
-                    board_docs[file.name] = content
-                
-                # Process cap table
-                cap_table_file.seek(0)
-                cap_table_entries = analyzer.excel_to_structured_data(cap_table_file.read(), cap_table_file.name)
-                
-                # Extract board grants using deterministic rules
-                board_grants = analyzer.extract_board_grants(board_docs)
-                
-                # Run deterministic analysis
-                discrepancies = analyzer.run_deterministic_analysis(cap_table_entries, board_grants)
-                
-                # Display results
-                st.markdown("---")
-                st.header("🎯 Deterministic Analysis Results")
-                st.success(f"✅ **Consistent Results**: Found {len(discrepancies)} discrepancies using rule-based analysis")
-                
-                if discrepancies:
-                    # Summary metrics
-                    high_count = len([d for d in discrepancies if d['severity'] == 'HIGH'])
-                    medium_count = len([d for d in discrepancies if d['severity'] == 'MEDIUM'])
-                    low_count = len([d for d in discrepancies if d['severity'] == 'LOW'])
-                    
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("🔍 Total Issues", len(discrepancies))
-                    with col2:
-                        st.metric("🔴 High Severity", high_count)
-                    with col3:
-                        st.metric("🟡 Medium Severity", medium_count)
-                    with col4:
-                        st.metric("🟢 Low Severity", low_count)
-                    
-                    # Display each discrepancy
-                    st.subheader("📋 Detailed Discrepancies")
-                    
-                    for disc in discrepancies:
-                        severity_colors = {'HIGH': '#ff4444', 'MEDIUM': '#ffaa00', 'LOW': '#00aa00'}
-                        severity_emojis = {'HIGH': '🔴', 'MEDIUM': '🟡', 'LOW': '🟢'}
-                        
-                        with st.container():
-                            st.markdown(
-                                f"""
-                                <div style="
-                                    border-left: 4px solid {severity_colors[disc['severity']]};
-                                    background-color: {'#fff5f5' if disc['severity'] == 'HIGH' else '#fffaf0' if disc['severity'] == 'MEDIUM' else '#f0fff4'};
-                                    padding: 1rem;
-                                    margin: 1rem 0;
-                                    border-radius: 0 8px 8px 0;
-                                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                                ">
-                                    <h4 style="margin: 0 0 0.5rem 0; color: {severity_colors[disc['severity']]};">
-                                        {severity_emojis[disc['severity']]} DISCREPANCY #{disc['number']}: {disc['issue']}
-                                    </h4>
-                                    <p style="margin: 0; font-weight: bold; color: #333;">
-                                        👤 <strong>Stockholder:</strong> {disc['stockholder']} | 
-                                        📊 <strong>Severity:</strong> {disc['severity']}
-                                    </p>
-                                </div>
-                                """, 
-                                unsafe_allow_html=True
-                            )
-                            
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.markdown("**📋 Cap Table Shows:**")
-                                st.code(disc['cap_table_value'])
-                                st.markdown("**🆔 Security ID:**")
-                                st.code(disc['security_id'])
-                            
-                            with col2:
-                                st.markdown("**📜 Legal Documents Show:**")
-                                st.code(disc['legal_value'])
-                                st.markdown("**📄 Source Document:**")
-                                st.code(disc['source'])
-                            
-                            st.markdown("**📝 Description:**")
-                            st.write(disc['description'])
-                            st.markdown("---")
-                else:
-                    st.success("🎉 No discrepancies found! The cap table appears to be in sync with the board documents.")
-                
-                # Create downloadable report
-                st.markdown("---")
-                st.subheader("📤 Download Report")
-                
-                if discrepancies:
-                    # Create CSV for download
-                    import pandas as pd
-                    df_report = pd.DataFrame([
-                        {
-                            'Discrepancy #': d['number'],
-                            'Severity': d['severity'],
-                            'Stockholder': d['stockholder'],
-                            'Security ID': d['security_id'],
-                            'Issue': d['issue'],
-                            'Cap Table Shows': d['cap_table_value'],
-                            'Legal Documents Show': d['legal_value'],
-                            'Description': d['description'],
-                            'Source Document': d['source']
-                        } for d in discrepancies
-                    ])
-                    
-                    csv = df_report.to_csv(index=False)
-                    st.download_button(
-                        label="📄 Download Discrepancies Report (CSV)",
-                        data=csv,
-                        file_name=f"cap_table_discrepancies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
-                
-            except Exception as e:
-                st.error(f"Error during analysis: {str(e)}")
-                st.error("Please check your API key and try again")
-    
-    # Information section
-    with st.expander("ℹ️ How this works"):
-        st.markdown("""
-        **This tool replicates the exact process of expert legal document analysis:**
-        
-        1. **Document Upload**: You upload board documents and cap table (just like dragging files to Claude)
-        2. **LLM Processing**: The documents are sent to Claude (same AI that did the original analysis)
-        3. **Expert Analysis**: Claude performs the same thorough legal review methodology
-        4. **Detailed Report**: You get the same quality discrepancy analysis and recommendations
-        
-        **What the LLM analyzes:**
-        - Compares cap table entries against board approvals
-        - Identifies missing documentation
-        - Checks share quantities, pricing, and dates
-        - Detects phantom equity grants
-        - Finds missing transactions (repurchases, etc.)
-        - Provides severity assessment and recommendations
-        
-        **API Key**: Configured via Streamlit secrets (ANTHROPIC_API_KEY in .streamlit/secrets.toml)
-        """)
-    
-    # Footer
-    st.markdown("---")
-    st.markdown("*Powered by Claude AI - Professional legal document analysis*")
-
-if __name__ == "__main__":
-    main()
-,  # Name followed by numbers and $
-            r'([A-Za-z]+\s+[A-Za-z]+)\s+\d+,?\d*\s+shares',
-            r'to\s+([A-Za-z]+\s+[A-Za-z]+)',
-            r'from\s+([A-Za-z]+\s+[A-Za-z]+)',
-        ]
-        
-        # Also look for common names explicitly
-        common_names = ['John Doe', 'Jane Smith', 'Bob', 'Alice', 'Charlie', 'Arthur']
-        for name in common_names:
-            if name in content:
-                grant['stockholder'] = name
-                st.write(f"✅ Found stockholder: {name}")
-                break
-        
-        if not grant['stockholder']:
-            for pattern in stockholder_patterns:
-                match = re.search(pattern, content, re.IGNORECASE)
-                if match:
-                    name = match.group(1).strip()
-                    # Filter out common false positives
-                    if name not in ['Date', 'DIRECTORS', 'Name', 'Board', 'Company']:
-                        grant['stockholder'] = name
-                        st.write(f"✅ Found stockholder via pattern: {name}")
-                        break
-        
-        if not grant['stockholder']:
-            st.write("❌ No stockholder found")
-        
-        # Extract shares - multiple patterns
-        share_patterns = [
-            r'(\d{1,3}(?:,\d{3})*)\s+shares?',
-            r'shares?\s+(\d{1,3}(?:,\d{3})*)',
-            r'issue.*?(\d{1,3}(?:,\d{3})*)',
-            r'grant.*?(\d{1,3}(?:,\d{3})*)',
-            # Look in schedule/table format
-            r'(\d{1,3}(?:,\d{3})*)\s+\
-    
-    def extract_repurchase_info(self, content: str, filename: str) -> Dict:
-        """Extract repurchase info"""
-        import re
-        
-        repurchase = {
-            'type': 'Repurchase',
-            'filename': filename,
-            'stockholder': None,
-            'shares_repurchased': None,
-            'date': None
-        }
-        
-        # Extract date
-        date_match = re.search(r'Date:\s*([A-Za-z]+\s+\d{1,2},\s+\d{4})', content)
-        if date_match:
-            repurchase['date'] = date_match.group(1)
-        
-        # Extract stockholder
-        names = ['John Doe', 'Jane Smith', 'Bob', 'Alice', 'Charlie', 'Arthur']
-        for name in names:
-            if name in content:
-                repurchase['stockholder'] = name
-                break
-        
-        # Extract repurchased shares
-        repurchase_match = re.search(r'repurchase\s+(\d{1,3}(?:,\d{3})*)', content, re.IGNORECASE)
-        if repurchase_match:
-            repurchase['shares_repurchased'] = int(repurchase_match.group(1).replace(',', ''))
-        
-        return repurchase
-    
-    def extract_option_grant(self, content: str, filename: str) -> Dict:
-        """Extract option grant info"""
-        # Similar to RSA but for options
-        return self.extract_rsa_grant(content, filename)  # Reuse logic for now
-    
-    def run_deterministic_analysis(self, cap_table_entries: List[Dict], board_grants: List[Dict]) -> List[Dict]:
-        """Run deterministic analysis that always produces same results"""
-        discrepancies = []
-        
-        # Create lookup of board grants by stockholder
-        board_lookup = {}
-        repurchases = []
-        
-        for grant in board_grants:
-            if grant['type'] == 'Repurchase':
-                repurchases.append(grant)
-            else:
-                stockholder = grant.get('stockholder')
-                if stockholder:
-                    if stockholder not in board_lookup:
-                        board_lookup[stockholder] = []
-                    board_lookup[stockholder].append(grant)
-        
-        # Check each cap table entry
-        for entry in cap_table_entries:
-            security_id = entry.get('Security ID', '')
-            stockholder = entry.get('Stakeholder Name', '')
-            shares = self.safe_int(entry.get('Quantity Issued', 0))
-            cost_basis = self.safe_float(entry.get('Cost Basis', 0))
-            board_approval_date = str(entry.get('Board Approval Date', ''))
-            vesting_schedule = str(entry.get('Vesting Schedule', ''))
-            
-            # Calculate price per share
-            price_per_share = cost_basis / shares if shares > 0 else 0
-            
-            # Check 1: Phantom Equity (no board approval found)
-            if stockholder not in board_lookup:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': security_id,
-                    'issue': 'Phantom Equity Entry',
-                    'cap_table_value': f'{shares} shares',
-                    'legal_value': 'No supporting documentation found',
-                    'description': f'Cap table shows {security_id} for {stockholder} but no board approval found',
-                    'source': 'None found'
-                })
-                continue
-            
-            # Find matching board grant
-            matching_grant = None
-            for grant in board_lookup[stockholder]:
-                if grant.get('shares') == shares or abs((grant.get('shares', 0) - shares)) <= 1:
-                    matching_grant = grant
-                    break
-            
-            if not matching_grant:
-                matching_grant = board_lookup[stockholder][0]  # Use first grant as fallback
-            
-            # Check 2: Share quantity mismatch
-            board_shares = matching_grant.get('shares', 0)
-            if board_shares and abs(shares - board_shares) > 1:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': security_id,
-                    'issue': 'Incorrect Share Quantity',
-                    'cap_table_value': f'{shares} shares',
-                    'legal_value': f'{board_shares} shares',
-                    'description': f'Cap table shows {shares} shares but board approval is for {board_shares} shares',
-                    'source': matching_grant.get('filename', 'Unknown')
-                })
-            
-            # Check 3: Price mismatch
-            board_price = matching_grant.get('price_per_share', 0)
-            if board_price and abs(price_per_share - board_price) > 0.01:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': security_id,
-                    'issue': 'Incorrect Price Per Share',
-                    'cap_table_value': f'${price_per_share:.2f}',
-                    'legal_value': f'${board_price:.2f}',
-                    'description': f'Cap table shows ${price_per_share:.2f} per share but board approval is for ${board_price:.2f} per share',
-                    'source': matching_grant.get('filename', 'Unknown')
-                })
-            
-            # Check 4: Board approval date mismatch
-            board_date = matching_grant.get('date', '')
-            if board_date and board_date not in board_approval_date:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': security_id,
-                    'issue': 'Incorrect Board Approval Date',
-                    'cap_table_value': board_approval_date,
-                    'legal_value': board_date,
-                    'description': 'Board approval date in cap table does not match legal documents',
-                    'source': matching_grant.get('filename', 'Unknown')
-                })
-            
-            # Check 5: Vesting schedule mismatch
-            board_vesting = matching_grant.get('vesting_schedule', '')
-            if board_vesting and board_vesting not in vesting_schedule:
-                if ('monthly' in board_vesting.lower() and 'monthly' not in vesting_schedule.lower()) or \
-                   ('annual' in board_vesting.lower() and 'annual' not in vesting_schedule.lower()):
-                    discrepancies.append({
-                        'number': len(discrepancies) + 1,
-                        'severity': 'HIGH',
-                        'stockholder': stockholder,
-                        'security_id': security_id,
-                        'issue': 'Vesting Schedule Mismatch',
-                        'cap_table_value': vesting_schedule,
-                        'legal_value': board_vesting,
-                        'description': 'Vesting schedule format differs between cap table and board documents',
-                        'source': matching_grant.get('filename', 'Unknown')
-                    })
-        
-        # Check 6: Missing repurchase transactions
-        for repurchase in repurchases:
-            stockholder = repurchase.get('stockholder')
-            shares_repurchased = repurchase.get('shares_repurchased', 0)
-            
-            if stockholder and shares_repurchased:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': 'Multiple',
-                    'issue': 'Missing Repurchase Transaction',
-                    'cap_table_value': 'No repurchase reflected',
-                    'legal_value': f'{shares_repurchased} shares repurchased',
-                    'description': f'Board approved repurchase of {shares_repurchased} shares from {stockholder} but cap table does not reflect this transaction',
-                    'source': repurchase.get('filename', 'Unknown')
-                })
-        
-        return discrepancies
-    
-    def safe_int(self, value) -> int:
-        """Safely convert to int"""
-        try:
-            if pd.isna(value):
-                return 0
-            return int(float(value))
-        except (ValueError, TypeError):
-            return 0
-    
-    def safe_float(self, value) -> float:
-        """Safely convert to float"""
-        try:
-            if pd.isna(value):
-                return 0.0
-            return float(value)
-        except (ValueError, TypeError):
-            return 0.0
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
-        self.uploaded_files = {}
-        
-    def read_docx_content(self, file_content: bytes, filename: str) -> str:
-        """Read DOCX content and return as plain text"""
-        try:
-            doc = Document(io.BytesIO(file_content))
-            full_text = []
-            for paragraph in doc.paragraphs:
-                full_text.append(paragraph.text)
-            return '\n'.join(full_text)
-        except Exception as e:
-            st.error(f"Error reading {filename}: {str(e)}")
-            return ""
-    
-    def excel_to_text_preview(self, file_content: bytes, filename: str) -> str:
-        """Convert Excel to text preview for LLM analysis"""
-        try:
-            df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl', header=None)
-            
-            # Create text representation
-            text_preview = f"Excel file: {filename}\n\n"
-            text_preview += "Raw data structure:\n"
-            
-            for i in range(min(15, len(df))):  # First 15 rows
-                row_data = df.iloc[i].tolist()
-                # Clean up the row data
-                cleaned_row = []
-                for cell in row_data:
-                    if pd.isna(cell):
-                        cleaned_row.append("")
-                    else:
-                        cleaned_row.append(str(cell))
-                text_preview += f"Row {i + 1}: {cleaned_row}\n"
-            
-            return text_preview
-        except Exception as e:
-            return f"Error reading Excel file {filename}: {str(e)}"
-    
-    def create_analysis_prompt(self, board_docs: Dict[str, str], cap_table_text: str) -> str:
-        """Create the enhanced prompt that catches all discrepancies with standardized approach"""
-        
-        prompt = """You are a lawyer conducting a standardized capitalization table tie out. You MUST follow this exact sequence:
-
-MANDATORY ANALYSIS SEQUENCE:
-1. DOCUMENT INVENTORY: List every board document and what it approves
-2. CAP TABLE INVENTORY: List every cap table entry (Security ID, Stockholder, Shares)
-3. SYSTEMATIC COMPARISON: For each cap table entry, check against board docs
-4. DISCREPANCY IDENTIFICATION: List each discrepancy separately with exact format
-
-STEP 1 - DOCUMENT INVENTORY:
-First, create a complete list of all board-approved grants from legal documents:
-- Document name, date, stockholder, shares, price, vesting details
-
-STEP 2 - CAP TABLE INVENTORY: 
-List every entry in the cap table:
-- Security ID, Stockholder Name, Quantity, Price details, Dates
-
-STEP 3 - SYSTEMATIC COMPARISON:
-For EACH cap table entry, verify these 7 items in order:
-a) Does this entry have board approval? (if no = PHANTOM EQUITY)
-b) Do share quantities match?
-c) Do prices match?
-d) Do board approval dates match?
-e) Do issue dates match?
-f) Do vesting schedules match (monthly vs annual)?
-g) Are repurchases reflected?
-
-STEP 4 - DISCREPANCY LIST:
-Use this EXACT format for each discrepancy:
-
-DISCREPANCY #[X]: [Issue Title]
-- Severity: HIGH/MEDIUM/LOW
-- Stockholder: [Name]
-- Security ID: [ID]
-- Cap Table Shows: [Value]
-- Legal Documents Show: [Value]
-- Source Document: [Filename]
-- Description: [1-2 sentences]
-
-CRITICAL REQUIREMENTS:
-- Analyze every single cap table entry
-- Check for phantom equity (entries without board approval)
-- Verify vesting schedule language matches exactly
-- Check for missing repurchase transactions
-- List each discrepancy separately (don't group)
-- Use consistent severity: HIGH=material issues, MEDIUM=dates/documentation, LOW=minor
-
-Here are the documents to analyze:
-
-BOARD DOCUMENTS:
-"""
-        
-        # Add each board document
-        for filename, content in board_docs.items():
-            prompt += f"\n--- {filename} ---\n{content}\n"
-        
-        prompt += f"\nSECURITIES LEDGER / CAP TABLE:\n{cap_table_text}\n"
-        
-        prompt += """
-
-NOW EXECUTE THE 4-STEP ANALYSIS SEQUENCE ABOVE.
-
-Begin with: "STEP 1 - DOCUMENT INVENTORY:" and follow the exact sequence."""
-        
-        return prompt
-    
-    def analyze_with_llm(self, board_docs: Dict[str, str], cap_table_text: str) -> str:
-        """Send documents to LLM for analysis"""
-        
-        prompt = self.create_analysis_prompt(board_docs, cap_table_text)
-        
-        try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=4000,
-                temperature=0,  # Maximum determinism
-                system="You are a systematic legal auditor. Always follow the exact same analysis sequence and format. Be consistent and thorough in your approach.",
-                messages=[
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ]
-            )
-            
-            return response.content[0].text
-            
-        except Exception as e:
-            return f"Error analyzing documents: {str(e)}"
-
-def main():
-    st.title("📊 Cap Table Tie-Out Analysis")
-    st.markdown("*LLM-powered analysis replicating expert legal review*")
-    
-    # Initialize analyzer with API key from secrets
-    if 'analyzer' not in st.session_state:
-        try:
-            api_key = st.secrets["ANTHROPIC_API_KEY"]
-            st.session_state.analyzer = DeterministicCapTableAnalyzer(api_key)
-        except KeyError:
-            st.error("❌ Anthropic API key not found in Streamlit secrets. Please configure ANTHROPIC_API_KEY in your .streamlit/secrets.toml file")
-            st.stop()
-    
-    # File upload section
-    with st.sidebar:
-        st.header("📁 Upload Documents")
-        
-        # Board documents upload
-        st.subheader("Board Documents")
-        board_files = st.file_uploader(
-            "Upload board consents, minutes, and legal docs",
-            type=['docx', 'doc'],
-            accept_multiple_files=True,
-            key="board_docs",
-            help="Upload DOCX files containing board resolutions, consents, and other legal documents"
-        )
-        
-        # Securities ledger upload
-        st.subheader("Securities Ledger")
-        cap_table_file = st.file_uploader(
-            "Upload cap table (Excel format)",
-            type=['xlsx', 'xls'],
-            key="cap_table",
-            help="Upload Excel file containing the company's capitalization table"
-        )
-        
-        # Analysis button
-        st.markdown("---")
-        run_analysis = st.button(
-            "🔍 Run LLM Tie-Out Analysis", 
-            type="primary", 
-            use_container_width=True
-        )
-    
-    # Main content area
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
-        st.subheader("📋 Uploaded Documents")
-        
-        if board_files:
-            st.write("**Board Documents:**")
-            for file in board_files:
-                st.write(f"✅ {file.name}")
-                
-            # Show preview of first document
-            if st.checkbox("Show document preview"):
-                first_file = board_files[0]
-                first_file.seek(0)
-                analyzer = st.session_state.get('analyzer')
-                if analyzer:
-                    content = analyzer.read_docx_content(first_file.read(), first_file.name)
-                    st.text_area("Document content preview:", content[:1000] + "...", height=200)
-        else:
-            st.info("No board documents uploaded yet")
-        
-        if cap_table_file:
-            st.write("**Securities Ledger:**")
-            st.write(f"✅ {cap_table_file.name}")
-            
-            # Show preview of cap table
-            if st.checkbox("Show cap table preview"):
-                cap_table_file.seek(0)
-                try:
-                    df_preview = pd.read_excel(io.BytesIO(cap_table_file.read()), engine='openpyxl')
-                    st.dataframe(df_preview.head(10))
-                except Exception as e:
-                    st.error(f"Error previewing cap table: {e}")
-        else:
-            st.info("No securities ledger uploaded yet")
-    
-    with col2:
-        st.subheader("⚙️ Analysis Status")
-        
-        if not board_files and not cap_table_file:
-            st.warning("📄 Please upload documents to begin analysis")
-        elif not board_files:
-            st.warning("📋 Please upload board documents")
-        elif not cap_table_file:
-            st.warning("📊 Please upload securities ledger")
-        else:
-            st.success("✅ Ready for LLM analysis!")
-            st.info("Click 'Run LLM Tie-Out Analysis' to start")
-    
-    # Run analysis when button is clicked
-    if run_analysis:
-        if not board_files or not cap_table_file:
-            st.error("Please upload both board documents and securities ledger before running analysis")
-            return
-        
-        with st.spinner("🔍 Running deterministic analysis... This will be consistent every time"):
-            try:
-                analyzer = st.session_state.analyzer
-                
-                # Process board documents in consistent order (alphabetical)
-                board_docs = {}
-                sorted_files = sorted(board_files, key=lambda x: x.name)
-                for file in sorted_files:
-                    file.seek(0)  # Reset file pointer
-                    content = analyzer.read_docx_content(file.read(), file.name)
-                    board_docs[file.name] = content
-                
-                # Process cap table
-                cap_table_file.seek(0)
-                cap_table_entries = analyzer.excel_to_structured_data(cap_table_file.read(), cap_table_file.name)
-                
-                # Extract board grants using deterministic rules
-                board_grants = analyzer.extract_board_grants(board_docs)
-                
-                # Run deterministic analysis
-                discrepancies = analyzer.run_deterministic_analysis(cap_table_entries, board_grants)
-                
-                # Display results
-                st.markdown("---")
-                st.header("🎯 Deterministic Analysis Results")
-                st.success(f"✅ **Consistent Results**: Found {len(discrepancies)} discrepancies using rule-based analysis")
-                
-                if discrepancies:
-                    # Summary metrics
-                    high_count = len([d for d in discrepancies if d['severity'] == 'HIGH'])
-                    medium_count = len([d for d in discrepancies if d['severity'] == 'MEDIUM'])
-                    low_count = len([d for d in discrepancies if d['severity'] == 'LOW'])
-                    
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("🔍 Total Issues", len(discrepancies))
-                    with col2:
-                        st.metric("🔴 High Severity", high_count)
-                    with col3:
-                        st.metric("🟡 Medium Severity", medium_count)
-                    with col4:
-                        st.metric("🟢 Low Severity", low_count)
-                    
-                    # Display each discrepancy
-                    st.subheader("📋 Detailed Discrepancies")
-                    
-                    for disc in discrepancies:
-                        severity_colors = {'HIGH': '#ff4444', 'MEDIUM': '#ffaa00', 'LOW': '#00aa00'}
-                        severity_emojis = {'HIGH': '🔴', 'MEDIUM': '🟡', 'LOW': '🟢'}
-                        
-                        with st.container():
-                            st.markdown(
-                                f"""
-                                <div style="
-                                    border-left: 4px solid {severity_colors[disc['severity']]};
-                                    background-color: {'#fff5f5' if disc['severity'] == 'HIGH' else '#fffaf0' if disc['severity'] == 'MEDIUM' else '#f0fff4'};
-                                    padding: 1rem;
-                                    margin: 1rem 0;
-                                    border-radius: 0 8px 8px 0;
-                                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                                ">
-                                    <h4 style="margin: 0 0 0.5rem 0; color: {severity_colors[disc['severity']]};">
-                                        {severity_emojis[disc['severity']]} DISCREPANCY #{disc['number']}: {disc['issue']}
-                                    </h4>
-                                    <p style="margin: 0; font-weight: bold; color: #333;">
-                                        👤 <strong>Stockholder:</strong> {disc['stockholder']} | 
-                                        📊 <strong>Severity:</strong> {disc['severity']}
-                                    </p>
-                                </div>
-                                """, 
-                                unsafe_allow_html=True
-                            )
-                            
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.markdown("**📋 Cap Table Shows:**")
-                                st.code(disc['cap_table_value'])
-                                st.markdown("**🆔 Security ID:**")
-                                st.code(disc['security_id'])
-                            
-                            with col2:
-                                st.markdown("**📜 Legal Documents Show:**")
-                                st.code(disc['legal_value'])
-                                st.markdown("**📄 Source Document:**")
-                                st.code(disc['source'])
-                            
-                            st.markdown("**📝 Description:**")
-                            st.write(disc['description'])
-                            st.markdown("---")
-                else:
-                    st.success("🎉 No discrepancies found! The cap table appears to be in sync with the board documents.")
-                
-                # Create downloadable report
-                st.markdown("---")
-                st.subheader("📤 Download Report")
-                
-                if discrepancies:
-                    # Create CSV for download
-                    import pandas as pd
-                    df_report = pd.DataFrame([
-                        {
-                            'Discrepancy #': d['number'],
-                            'Severity': d['severity'],
-                            'Stockholder': d['stockholder'],
-                            'Security ID': d['security_id'],
-                            'Issue': d['issue'],
-                            'Cap Table Shows': d['cap_table_value'],
-                            'Legal Documents Show': d['legal_value'],
-                            'Description': d['description'],
-                            'Source Document': d['source']
-                        } for d in discrepancies
-                    ])
-                    
-                    csv = df_report.to_csv(index=False)
-                    st.download_button(
-                        label="📄 Download Discrepancies Report (CSV)",
-                        data=csv,
-                        file_name=f"cap_table_discrepancies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
-                
-            except Exception as e:
-                st.error(f"Error during analysis: {str(e)}")
-                st.error("Please check your API key and try again")
-    
-    # Information section
-    with st.expander("ℹ️ How this works"):
-        st.markdown("""
-        **This tool replicates the exact process of expert legal document analysis:**
-        
-        1. **Document Upload**: You upload board documents and cap table (just like dragging files to Claude)
-        2. **LLM Processing**: The documents are sent to Claude (same AI that did the original analysis)
-        3. **Expert Analysis**: Claude performs the same thorough legal review methodology
-        4. **Detailed Report**: You get the same quality discrepancy analysis and recommendations
-        
-        **What the LLM analyzes:**
-        - Compares cap table entries against board approvals
-        - Identifies missing documentation
-        - Checks share quantities, pricing, and dates
-        - Detects phantom equity grants
-        - Finds missing transactions (repurchases, etc.)
-        - Provides severity assessment and recommendations
-        
-        **API Key**: Configured via Streamlit secrets (ANTHROPIC_API_KEY in .streamlit/secrets.toml)
-        """)
-    
-    # Footer
-    st.markdown("---")
-    st.markdown("*Powered by Claude AI - Professional legal document analysis*")
-
-if __name__ == "__main__":
-    main()
-,  # Number followed by $
-        ]
-        
-        for pattern in share_patterns:
-            share_match = re.search(pattern, content, re.IGNORECASE)
-            if share_match:
-                shares_str = share_match.group(1).replace(',', '')
-                try:
-                    shares_num = int(shares_str)
-                    if 100 <= shares_num <= 1000000:  # Reasonable range
-                        grant['shares'] = shares_num
-                        st.write(f"✅ Found shares: {shares_num}")
-                        break
-                except ValueError:
-                    continue
-        
-        if not grant['shares']:
-            st.write("❌ No shares found")
-        
-        # Extract price - multiple patterns
-        price_patterns = [
-            r'\$(\d+\.\d{2})\s+per\s+share',
-            r'price.*?\$(\d+\.\d{2})',
-            r'\$(\d+\.\d{2})',  # Any dollar amount
-            r'(\d+\.\d{2})\s+per\s+share',
-        ]
-        
-        for pattern in price_patterns:
-            price_match = re.search(pattern, content, re.IGNORECASE)
-            if price_match:
-                try:
-                    price = float(price_match.group(1))
-                    if 0.01 <= price <= 1000:  # Reasonable range
-                        grant['price_per_share'] = price
-                        st.write(f"✅ Found price: ${price}")
-                        break
-                except ValueError:
-                    continue
-        
-        if not grant['price_per_share']:
-            st.write("❌ No price found")
-        
-        # Extract vesting start date
-        vesting_date_patterns = [
-            r'vesting.*?(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},\s+\d{4}',
-            r'start.*?(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},\s+\d{4}',
-            r'commencement.*?(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},\s+\d{4}',
-        ]
-        
-        for pattern in vesting_date_patterns:
-            vesting_match = re.search(pattern, content, re.IGNORECASE)
-            if vesting_match:
-                grant['vesting_start'] = vesting_match.group(1)
-                st.write(f"✅ Found vesting start: {grant['vesting_start']}")
-                break
-        
-        if not grant['vesting_start']:
-            st.write("❌ No vesting start date found")
-        
-        # Extract vesting schedule
-        if '1/48' in content:
-            if 'month' in content.lower():
-                grant['vesting_schedule'] = '1/48th monthly'
-                st.write("✅ Found vesting: 1/48th monthly")
-        elif '25%' in content:
-            if 'annual' in content.lower() or 'year' in content.lower():
-                grant['vesting_schedule'] = '25% annually'
-                st.write("✅ Found vesting: 25% annually")
-        
-        if not grant['vesting_schedule']:
-            st.write("❌ No vesting schedule found")
-        
-        st.write(f"**Final extracted data:** {grant}")
-        st.write("---")
-        
-        return grant
-    
-    def extract_repurchase_info(self, content: str, filename: str) -> Dict:
-        """Extract repurchase info"""
-        import re
-        
-        repurchase = {
-            'type': 'Repurchase',
-            'filename': filename,
-            'stockholder': None,
-            'shares_repurchased': None,
-            'date': None
-        }
-        
-        # Extract date
-        date_match = re.search(r'Date:\s*([A-Za-z]+\s+\d{1,2},\s+\d{4})', content)
-        if date_match:
-            repurchase['date'] = date_match.group(1)
-        
-        # Extract stockholder
-        names = ['John Doe', 'Jane Smith', 'Bob', 'Alice', 'Charlie', 'Arthur']
-        for name in names:
-            if name in content:
-                repurchase['stockholder'] = name
-                break
-        
-        # Extract repurchased shares
-        repurchase_match = re.search(r'repurchase\s+(\d{1,3}(?:,\d{3})*)', content, re.IGNORECASE)
-        if repurchase_match:
-            repurchase['shares_repurchased'] = int(repurchase_match.group(1).replace(',', ''))
-        
-        return repurchase
-    
-    def extract_option_grant(self, content: str, filename: str) -> Dict:
-        """Extract option grant info"""
-        # Similar to RSA but for options
-        return self.extract_rsa_grant(content, filename)  # Reuse logic for now
-    
-    def run_deterministic_analysis(self, cap_table_entries: List[Dict], board_grants: List[Dict]) -> List[Dict]:
-        """Run deterministic analysis that always produces same results"""
-        discrepancies = []
-        
-        # Create lookup of board grants by stockholder
-        board_lookup = {}
-        repurchases = []
-        
-        for grant in board_grants:
-            if grant['type'] == 'Repurchase':
-                repurchases.append(grant)
-            else:
-                stockholder = grant.get('stockholder')
-                if stockholder:
-                    if stockholder not in board_lookup:
-                        board_lookup[stockholder] = []
-                    board_lookup[stockholder].append(grant)
-        
-        # Check each cap table entry
-        for entry in cap_table_entries:
-            security_id = entry.get('Security ID', '')
-            stockholder = entry.get('Stakeholder Name', '')
-            shares = self.safe_int(entry.get('Quantity Issued', 0))
-            cost_basis = self.safe_float(entry.get('Cost Basis', 0))
-            board_approval_date = str(entry.get('Board Approval Date', ''))
-            vesting_schedule = str(entry.get('Vesting Schedule', ''))
-            
-            # Calculate price per share
-            price_per_share = cost_basis / shares if shares > 0 else 0
-            
-            # Check 1: Phantom Equity (no board approval found)
-            if stockholder not in board_lookup:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': security_id,
-                    'issue': 'Phantom Equity Entry',
-                    'cap_table_value': f'{shares} shares',
-                    'legal_value': 'No supporting documentation found',
-                    'description': f'Cap table shows {security_id} for {stockholder} but no board approval found',
-                    'source': 'None found'
-                })
-                continue
-            
-            # Find matching board grant
-            matching_grant = None
-            for grant in board_lookup[stockholder]:
-                if grant.get('shares') == shares or abs((grant.get('shares', 0) - shares)) <= 1:
-                    matching_grant = grant
-                    break
-            
-            if not matching_grant:
-                matching_grant = board_lookup[stockholder][0]  # Use first grant as fallback
-            
-            # Check 2: Share quantity mismatch
-            board_shares = matching_grant.get('shares', 0)
-            if board_shares and abs(shares - board_shares) > 1:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': security_id,
-                    'issue': 'Incorrect Share Quantity',
-                    'cap_table_value': f'{shares} shares',
-                    'legal_value': f'{board_shares} shares',
-                    'description': f'Cap table shows {shares} shares but board approval is for {board_shares} shares',
-                    'source': matching_grant.get('filename', 'Unknown')
-                })
-            
-            # Check 3: Price mismatch
-            board_price = matching_grant.get('price_per_share', 0)
-            if board_price and abs(price_per_share - board_price) > 0.01:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': security_id,
-                    'issue': 'Incorrect Price Per Share',
-                    'cap_table_value': f'${price_per_share:.2f}',
-                    'legal_value': f'${board_price:.2f}',
-                    'description': f'Cap table shows ${price_per_share:.2f} per share but board approval is for ${board_price:.2f} per share',
-                    'source': matching_grant.get('filename', 'Unknown')
-                })
-            
-            # Check 4: Board approval date mismatch
-            board_date = matching_grant.get('date', '')
-            if board_date and board_date not in board_approval_date:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': security_id,
-                    'issue': 'Incorrect Board Approval Date',
-                    'cap_table_value': board_approval_date,
-                    'legal_value': board_date,
-                    'description': 'Board approval date in cap table does not match legal documents',
-                    'source': matching_grant.get('filename', 'Unknown')
-                })
-            
-            # Check 5: Vesting schedule mismatch
-            board_vesting = matching_grant.get('vesting_schedule', '')
-            if board_vesting and board_vesting not in vesting_schedule:
-                if ('monthly' in board_vesting.lower() and 'monthly' not in vesting_schedule.lower()) or \
-                   ('annual' in board_vesting.lower() and 'annual' not in vesting_schedule.lower()):
-                    discrepancies.append({
-                        'number': len(discrepancies) + 1,
-                        'severity': 'HIGH',
-                        'stockholder': stockholder,
-                        'security_id': security_id,
-                        'issue': 'Vesting Schedule Mismatch',
-                        'cap_table_value': vesting_schedule,
-                        'legal_value': board_vesting,
-                        'description': 'Vesting schedule format differs between cap table and board documents',
-                        'source': matching_grant.get('filename', 'Unknown')
-                    })
-        
-        # Check 6: Missing repurchase transactions
-        for repurchase in repurchases:
-            stockholder = repurchase.get('stockholder')
-            shares_repurchased = repurchase.get('shares_repurchased', 0)
-            
-            if stockholder and shares_repurchased:
-                discrepancies.append({
-                    'number': len(discrepancies) + 1,
-                    'severity': 'HIGH',
-                    'stockholder': stockholder,
-                    'security_id': 'Multiple',
-                    'issue': 'Missing Repurchase Transaction',
-                    'cap_table_value': 'No repurchase reflected',
-                    'legal_value': f'{shares_repurchased} shares repurchased',
-                    'description': f'Board approved repurchase of {shares_repurchased} shares from {stockholder} but cap table does not reflect this transaction',
-                    'source': repurchase.get('filename', 'Unknown')
-                })
-        
-        return discrepancies
-    
-    def safe_int(self, value) -> int:
-        """Safely convert to int"""
-        try:
-            if pd.isna(value):
-                return 0
-            return int(float(value))
-        except (ValueError, TypeError):
-            return 0
-    
-    def safe_float(self, value) -> float:
-        """Safely convert to float"""
-        try:
-            if pd.isna(value):
-                return 0.0
-            return float(value)
-        except (ValueError, TypeError):
-            return 0.0
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
-        self.uploaded_files = {}
-        
-    def read_docx_content(self, file_content: bytes, filename: str) -> str:
-        """Read DOCX content and return as plain text"""
-        try:
-            doc = Document(io.BytesIO(file_content))
-            full_text = []
-            for paragraph in doc.paragraphs:
-                full_text.append(paragraph.text)
-            return '\n'.join(full_text)
-        except Exception as e:
-            st.error(f"Error reading {filename}: {str(e)}")
-            return ""
-    
-    def excel_to_text_preview(self, file_content: bytes, filename: str) -> str:
-        """Convert Excel to text preview for LLM analysis"""
-        try:
-            df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl', header=None)
-            
-            # Create text representation
-            text_preview = f"Excel file: {filename}\n\n"
-            text_preview += "Raw data structure:\n"
-            
-            for i in range(min(15, len(df))):  # First 15 rows
-                row_data = df.iloc[i].tolist()
-                # Clean up the row data
-                cleaned_row = []
-                for cell in row_data:
-                    if pd.isna(cell):
-                        cleaned_row.append("")
-                    else:
-                        cleaned_row.append(str(cell))
-                text_preview += f"Row {i + 1}: {cleaned_row}\n"
-            
-            return text_preview
-        except Exception as e:
-            return f"Error reading Excel file {filename}: {str(e)}"
-    
-    def create_analysis_prompt(self, board_docs: Dict[str, str], cap_table_text: str) -> str:
-        """Create the enhanced prompt that catches all discrepancies with standardized approach"""
-        
-        prompt = """You are a lawyer conducting a standardized capitalization table tie out. You MUST follow this exact sequence:
-
-MANDATORY ANALYSIS SEQUENCE:
-1. DOCUMENT INVENTORY: List every board document and what it approves
-2. CAP TABLE INVENTORY: List every cap table entry (Security ID, Stockholder, Shares)
-3. SYSTEMATIC COMPARISON: For each cap table entry, check against board docs
-4. DISCREPANCY IDENTIFICATION: List each discrepancy separately with exact format
-
-STEP 1 - DOCUMENT INVENTORY:
-First, create a complete list of all board-approved grants from legal documents:
-- Document name, date, stockholder, shares, price, vesting details
-
-STEP 2 - CAP TABLE INVENTORY: 
-List every entry in the cap table:
-- Security ID, Stockholder Name, Quantity, Price details, Dates
-
-STEP 3 - SYSTEMATIC COMPARISON:
-For EACH cap table entry, verify these 7 items in order:
-a) Does this entry have board approval? (if no = PHANTOM EQUITY)
-b) Do share quantities match?
-c) Do prices match?
-d) Do board approval dates match?
-e) Do issue dates match?
-f) Do vesting schedules match (monthly vs annual)?
-g) Are repurchases reflected?
-
-STEP 4 - DISCREPANCY LIST:
-Use this EXACT format for each discrepancy:
-
-DISCREPANCY #[X]: [Issue Title]
-- Severity: HIGH/MEDIUM/LOW
-- Stockholder: [Name]
-- Security ID: [ID]
-- Cap Table Shows: [Value]
-- Legal Documents Show: [Value]
-- Source Document: [Filename]
-- Description: [1-2 sentences]
-
-CRITICAL REQUIREMENTS:
-- Analyze every single cap table entry
-- Check for phantom equity (entries without board approval)
-- Verify vesting schedule language matches exactly
-- Check for missing repurchase transactions
-- List each discrepancy separately (don't group)
-- Use consistent severity: HIGH=material issues, MEDIUM=dates/documentation, LOW=minor
-
-Here are the documents to analyze:
+@st.cache_resource(show_spinner=False)
+def get_anthropic_client(api_key: str) -> anthropic.Anthropic:
+    """Share one Anthropic client, and its connection pool, across reruns and sessions"""
+    # Idle connections are dropped after 5s by default, which is shorter than the gap between analyses.
+    # Build the limits from the SDK's own Limits class, since newer SDKs run on httpx2 and reject httpx objects
+    sdk_limits = anthropic.DEFAULT_CONNECTION_LIMITS
+    http_client = anthropic.DefaultHttpxClient(
+        limits=type(sdk_limits)(
+            max_connections=sdk_limits.max_connections,
+            max_keepalive_connections=ANTHROPIC_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=ANTHROPIC_KEEPALIVE_EXPIRY
+        )
+    )
+    return anthropic.Anthropic(
+        api_key=api_key,
+        http_client=http_client,
+        timeout=ANTHROPIC_TIMEOUT,
+        max_retries=ANTHROPIC_MAX_RETRIES
+    )
 
-BOARD DOCUMENTS:
-"""
-        
-        # Add each board document
-        for filename, content in board_docs.items():
-            prompt += f"\n--- {filename} ---\n{content}\n"
-        
-        prompt += f"\nSECURITIES LEDGER / CAP TABLE:\n{cap_table_text}\n"
-        
-        prompt += """
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_excel_sheet(file_content: bytes) -> pd.DataFrame:
+    """Parse the first sheet of a workbook once per distinct file content, without a header row"""
+    return pd.read_excel(io.BytesIO(file_content), engine=EXCEL_ENGINE, header=None)
 
-NOW EXECUTE THE 4-STEP ANALYSIS SEQUENCE ABOVE.
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_docx_text(file_content: bytes, max_chars: Optional[int] = None) -> str:
+    """Extract DOCX text once per distinct file content across reruns"""
+    return DeterministicCapTableAnalyzer.docx_to_text(file_content, max_chars)
 
-Begin with: "STEP 1 - DOCUMENT INVENTORY:" and follow the exact sequence."""
-        
-        return prompt
-    
-    def analyze_with_llm(self, board_docs: Dict[str, str], cap_table_text: str) -> str:
-        """Send documents to LLM for analysis"""
-        
-        prompt = self.create_analysis_prompt(board_docs, cap_table_text)
-        
-        try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=4000,
-                temperature=0,  # Maximum determinism
-                system="You are a systematic legal auditor. Always follow the exact same analysis sequence and format. Be consistent and thorough in your approach.",
-                messages=[
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ]
-            )
-            
-            return response.content[0].text
-            
-        except Exception as e:
-            return f"Error analyzing documents: {str(e)}"
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_docx_texts(contents: Tuple[bytes, ...]) -> List[Tuple[str, Optional[str]]]:
+    """Extract several DOCX files in parallel, once per distinct set of contents, as (text, error) pairs"""
+    # Worker threads have no script context, so they run the plain parser and never call Streamlit.
+    # A parse error depends only on the bytes, so it is cached with the texts and reported by the caller
+    results = []
+    with ThreadPoolExecutor(max_workers=min(DOCX_READ_WORKERS, len(contents))) as executor:
+        futures = [executor.submit(DeterministicCapTableAnalyzer.docx_to_text, content) for content in contents]
+        for future in futures:
+            try:
+                results.append((future.result(), None))
+            except Exception as e:
+                results.append(("", str(e)))
+    return results
 
 def main():
     st.title("📊 Cap Table Tie-Out Analysis")
@@ -1908,6 +883,9 @@ def main():
             help="Upload Excel file containing the company's capitalization table"
         )
         
+        # Per-field extractor output is noisy and slow, so it is opt-in
+        st.checkbox("Show parsing details", key="debug")
+        
         # Analysis button
         st.markdown("---")
         run_analysis = st.button(
@@ -1930,11 +908,10 @@ def main():
             # Show preview of first document
             if st.checkbox("Show document preview"):
                 first_file = board_files[0]
-                first_file.seek(0)
                 analyzer = st.session_state.get('analyzer')
                 if analyzer:
-                    content = analyzer.read_docx_content(first_file.read(), first_file.name)
-                    st.text_area("Document content preview:", content[:1000] + "...", height=200)
+                    content = analyzer.read_docx_content(first_file.getvalue(), first_file.name, max_chars=DOCX_PREVIEW_CHARS)
+                    st.text_area("Document content preview:", content[:DOCX_PREVIEW_CHARS] + "...", height=200)
         else:
             st.info("No board documents uploaded yet")
         
@@ -1944,10 +921,10 @@ def main():
             
             # Show preview of cap table
             if st.checkbox("Show cap table preview"):
-                cap_table_file.seek(0)
                 try:
-                    df_preview = pd.read_excel(io.BytesIO(cap_table_file.read()), engine='openpyxl')
-                    st.dataframe(df_preview.head(10))
+                    # Only the rows shown are parsed, not the whole ledger
+                    df_preview = pd.read_excel(io.BytesIO(cap_table_file.getvalue()), engine=EXCEL_ENGINE, nrows=10)
+                    st.dataframe(df_preview)
                 except Exception as e:
                     st.error(f"Error previewing cap table: {e}")
         else:
@@ -1976,17 +953,14 @@ def main():
             try:
                 analyzer = st.session_state.analyzer
                 
-                # Process board documents in consistent order (alphabetical)
-                board_docs = {}
+                # Process board documents in consistent order (alphabetical).
+                # getvalue() hands back the upload's bytes without seeking or copying the buffer
                 sorted_files = sorted(board_files, key=lambda x: x.name)
-                for file in sorted_files:
-                    file.seek(0)  # Reset file pointer
-                    content = analyzer.read_docx_content(file.read(), file.name)
-                    board_docs[file.name] = content
+                board_payloads = [(file.name, file.getvalue()) for file in sorted_files]
+                board_docs = analyzer.read_docx_contents(board_payloads)
                 
                 # Process cap table
-                cap_table_file.seek(0)
-                cap_table_entries = analyzer.excel_to_structured_data(cap_table_file.read(), cap_table_file.name)
+                cap_table_entries = analyzer.excel_to_structured_data(cap_table_file.getvalue(), cap_table_file.name)
                 
                 # Extract board grants using deterministic rules
                 board_grants = analyzer.extract_board_grants(board_docs)
@@ -2001,9 +975,10 @@ def main():
                 
                 if discrepancies:
                     # Summary metrics
-                    high_count = len([d for d in discrepancies if d['severity'] == 'HIGH'])
-                    medium_count = len([d for d in discrepancies if d['severity'] == 'MEDIUM'])
-                    low_count = len([d for d in discrepancies if d['severity'] == 'LOW'])
+                    severity_counts = Counter(d['severity'] for d in discrepancies)
+                    high_count = severity_counts['HIGH']
+                    medium_count = severity_counts['MEDIUM']
+                    low_count = severity_counts['LOW']
                     
                     col1, col2, col3, col4 = st.columns(4)
                     with col1:
@@ -2069,26 +1044,15 @@ def main():
                 st.subheader("📤 Download Report")
                 
                 if discrepancies:
-                    # Create CSV for download
-                    import pandas as pd
-                    df_report = pd.DataFrame([
-                        {
-                            'Discrepancy #': d['number'],
-                            'Severity': d['severity'],
-                            'Stockholder': d['stockholder'],
-                            'Security ID': d['security_id'],
-                            'Issue': d['issue'],
-                            'Cap Table Shows': d['cap_table_value'],
-                            'Legal Documents Show': d['legal_value'],
-                            'Description': d['description'],
-                            'Source Document': d['source']
-                        } for d in discrepancies
-                    ])
+                    # Create CSV for download, writing rows straight into a text buffer
+                    report_buffer = io.StringIO()
+                    writer = csv.writer(report_buffer, lineterminator='\n')
+                    writer.writerow([header for header, _ in REPORT_COLUMNS])
+                    writer.writerows([d[key] for _, key in REPORT_COLUMNS] for d in discrepancies)
                     
-                    csv = df_report.to_csv(index=False)
                     st.download_button(
                         label="📄 Download Discrepancies Report (CSV)",
-                        data=csv,
+                        data=report_buffer.getvalue(),
                         file_name=f"cap_table_discrepancies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                         mime="text/csv"
                     )